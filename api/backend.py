@@ -1,9 +1,36 @@
-from flask import Flask, jsonify, Request
+import importlib.util
+import os
+import sys
+import threading
+from functools import wraps
+
+from flask import Flask, g, jsonify, Request, request
 from flask_cors import CORS
+from werkzeug.exceptions import NotFound
+
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(os.path.dirname(API_DIR), 'backend')
+sys.path.insert(0, API_DIR)
+
+from recommender import get_recommender  # noqa: E402
 
 app = Flask(__name__)
 CORS(app)
 
+def use_backend_modules():
+    """Make backend/ importable, deferred until a request needs it"""
+    if BACKEND_DIR not in sys.path:
+        sys.path.append(BACKEND_DIR)
+
+def requires_auth(f):
+    """Check the JWT with backend/auth.py, imported on the first request"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        use_backend_modules()
+        from auth import requires_auth as backend_requires_auth
+        return backend_requires_auth(f)(*args, **kwargs)
+    return decorated
+
 @app.route('/api/test', methods=['GET'])
 def test():
     return jsonify({"message": "API is working!"})
@@ -12,6 +39,97 @@ def test():
 def hello():
     return jsonify({"message": "Hello from Python backend!"})
 
+@app.route('/api/get_meal_plan', methods=['GET', 'POST'])
+@requires_auth
+def get_meal_plan():
+    use_backend_modules()
+    from request_params import parse_bool, resolve_seed
+    try:
+        data = request.args if request.method == 'GET' else request.json
+        preferences = {
+            'vegan': parse_bool(data.get('vegan', False)),
+            'vegetarian': parse_bool(data.get('vegetarian', False)),
+            'gluten_free': parse_bool(data.get('gluten_free', False)),
+            'halal': parse_bool(data.get('halal', False)),
+            'target_calories': float(data.get('target_calories', 2000)),
+            'target_protein': float(data.get('target_protein', 50))
+        }
+
+        try:
+            # 'daily' plans are keyed by the verified token subject, not a header the client controls
+            seed = resolve_seed(data.get('seed'), g.current_user.get('sub'))
+        except ValueError:
+            return jsonify({'error': "seed must be a non-negative integer or 'daily'"}), 400
+
+        location = data.get('location')
+        meal_plan = get_recommender().get_meal_plan(preferences, location, seed)
+        if meal_plan is None:
+            return jsonify({'error': f'Unknown location: {location}'}), 400
+
+        return jsonify(meal_plan)
+    except Exception as e:
+        print(f"Error in get_meal_plan: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+class FullBackendFallback:
+    """Send routes this app does not serve to backend/backend.py, imported on first use
+
+    Keeps pandas, scikit-learn, selenium and anthropic out of cold starts that
+    only need meal plans. Deployments where it fails to load, e.g. without those
+    packages, answer 503.
+    """
+
+    def __init__(self, slim_app):
+        self.slim_app = slim_app
+        self.slim_wsgi_app = slim_app.wsgi_app
+        self.full_wsgi_app = None
+        self.load_error = None
+        self._lock = threading.Lock()
+
+    def load_full_backend(self):
+        with self._lock:
+            if self.full_wsgi_app is None and self.load_error is None:
+                use_backend_modules()
+                try:
+                    # Loaded under another name, this module may itself be imported as 'backend'
+                    spec = importlib.util.spec_from_file_location('vora_backend', os.path.join(BACKEND_DIR, 'backend.py'))
+                    full_backend = importlib.util.module_from_spec(spec)
+                    spec.loader.exec_module(full_backend)
+                    self.full_wsgi_app = full_backend.app
+                except Exception as e:
+                    # Missing packages or data files; remembered so later requests answer 503 at once
+                    print(f"Full backend unavailable: {str(e)}")
+                    self.load_error = e
+        return self.full_wsgi_app
+
+    def __call__(self, environ, start_response):
+        try:
+            self.slim_app.url_map.bind_to_environ(environ).match()
+        except NotFound:
+            pass
+        except Exception:
+            # Let the slim app produce its usual response, e.g. 405
+            return self.slim_wsgi_app(environ, start_response)
+        else:
+            return self.slim_wsgi_app(environ, start_response)
+
+        full_app = self.load_full_backend()
+        if full_app is None:
+            with self.slim_app.request_context(environ):
+                response = jsonify({'error': 'This endpoint is not available in this deployment'})
+                response.status_code = 503
+            return response(environ, start_response)
+
+        # The full backend serves the same routes without the /api prefix
+        environ = dict(environ)
+        path = environ.get('PATH_INFO', '')
+        if path.startswith('/api/'):
+            environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '') + '/api'
+            environ['PATH_INFO'] = path[len('/api'):]
+        return full_app(environ, start_response)
+
+app.wsgi_app = FullBackendFallback(app)
+
 def handler(request):
     """Handle incoming requests."""
-    return app(request)
\ No newline at end of file
+    return app(request)
@@ -0,0 +1,119 @@
+"""NumPy-only meal recommender served from the artifact built by backend/export_artifact.py
+
+Mirrors backend.get_meal_recommendations without pandas or scikit-learn so
+serverless cold starts stay cheap. For the same seed and artifact it returns
+the same plan as the full backend, which skips its plan table for seeded
+requests.
+"""
+import os
+import re
+
+import numpy as np
+
+ARTIFACT_PATH = os.getenv('VORA_ARTIFACT', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recommender.npz'))
+MEAL_TYPES = ['Breakfast', 'Lunch', 'Dinner']
+
+# Column order of the artifact's 'dietary' matrix
+DIETARY_KEYS = ['vegan', 'vegetarian', 'gluten_free', 'halal']
+DIETARY_FEATURES = {
+    'vegan': 'Vegan',
+    'gluten_free': 'Made Without Gluten',
+    'vegetarian': 'Vegetarian',
+    'halal': 'Halal'
+}
+
+class Recommender:
+    def __init__(self, path=ARTIFACT_PATH):
+        with np.load(path) as artifact:
+            self.arrays = {key: artifact[key] for key in artifact.files}
+
+        self.feature_cols = list(self.arrays['feature_cols'])
+        self.mean = self.arrays['scaler_mean']
+        self.scale = self.arrays['scaler_scale']
+        offsets = self.arrays['shard_offsets']
+        self.shards = {
+            str(name): (int(offsets[i]), int(offsets[i + 1]))
+            for i, name in enumerate(self.arrays['shard_names'])
+        }
+        self.aliases = dict(zip(map(str, self.arrays['alias_names']), map(str, self.arrays['alias_locations'])))
+
+        # Unit-length rows so cosine similarity is a single matrix-vector product
+        features = self.arrays['features']
+        norms = np.linalg.norm(features, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        self.unit_features = features / norms
+
+    @property
+    def locations(self):
+        return sorted(name for name in self.shards if name != 'all')
+
+    def shard_range(self, location=None):
+        """Row range of a location's shard, or None if unknown"""
+        if not location:
+            return self.shards['all']
+        # Same normalization as catalog.normalize_location
+        key = re.sub(r'\s+', ' ', str(location).strip().lower())
+        key = self.aliases.get(key) or re.sub(r'[^a-z0-9]+', '_', key).strip('_')
+        return self.shards.get(key)
+
+    def preference_vector(self, preferences):
+        user_pref = np.zeros(len(self.feature_cols))
+        for pref_key, feature_key in DIETARY_FEATURES.items():
+            if bool(preferences.get(pref_key, False)):
+                user_pref[self.feature_cols.index(feature_key)] = 1
+        user_pref[self.feature_cols.index('Calories')] = float(preferences.get('target_calories', 2000)) / 3
+        user_pref[self.feature_cols.index('Protein')] = float(preferences.get('target_protein', 50)) / 3
+        return (user_pref - self.mean) / self.scale
+
+    def get_meal_plan(self, preferences, location=None, seed=None):
+        """Top 5 items per meal, or None if the location is unknown"""
+        shard = self.shard_range(location)
+        if shard is None:
+            return None
+        start, stop = shard
+        rng = np.random.default_rng(seed) if seed is not None else np.random
+
+        dietary = self.arrays['dietary'][start:stop]
+        valid = np.ones(stop - start, dtype=bool)
+        for i, key in enumerate(DIETARY_KEYS):
+            if bool(preferences.get(key, False)):
+                valid &= dietary[:, i]
+        if bool(preferences.get('vegan', False)):
+            valid &= dietary[:, DIETARY_KEYS.index('vegetarian')]
+
+        user = self.preference_vector(preferences)
+        norm = np.linalg.norm(user)
+        scores = self.unit_features[start:stop] @ (user / norm if norm else user)
+
+        names = self.arrays['names']
+        restrictions = self.arrays['restrictions']
+        nutrition = self.arrays['nutrition']
+        meals = self.arrays['meals'][start:stop]
+
+        meal_plan = {}
+        for m, meal_type in enumerate(MEAL_TYPES):
+            candidates = np.flatnonzero(valid & meals[:, m])
+            meal_scores = scores[candidates] + rng.uniform(-0.1, 0.1, size=len(candidates))
+            top_indices = candidates[np.argsort(meal_scores)[-5:][::-1]] + start
+
+            meal_plan[meal_type.lower()] = [
+                {
+                    'name': str(names[idx]),
+                    'calories': float(nutrition[idx, 0]),
+                    'protein': float(nutrition[idx, 1]),
+                    'carbs': float(nutrition[idx, 2]),
+                    'fat': float(nutrition[idx, 3]),
+                    'dietary_restrictions': str(restrictions[idx])
+                }
+                for idx in top_indices
+            ]
+        return meal_plan
+
+_recommender = None
+
+def get_recommender():
+    """Load the artifact on first use and keep it for the life of the instance"""
+    global _recommender
+    if _recommender is None:
+        _recommender = Recommender()
+    return _recommender
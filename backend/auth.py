@@ -2,8 +2,14 @@ import json
 from functools import wraps
 from jose import jwt
 from urllib.request import urlopen
-from flask import request, jsonify
+from flask import request, jsonify, g
 from os import environ
+try:
+    from metrics import observe_stage
+except ImportError:
+    # prometheus_client is left out of the slim serverless bundle
+    from contextlib import nullcontext as observe_stage
+from profiler import start_request_profile
 
 AUTH0_DOMAIN = 'dev-sb5f12qflr42rjzm.us.auth0.com'
 ALGORITHMS = ['RS256']
@@ -48,8 +54,9 @@ def get_token_auth_header():
 
 def verify_decode_jwt(token):
     """Verifies the JWT token"""
-    jsonurl = urlopen(f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
-    jwks = json.loads(jsonurl.read())
+    with observe_stage('jwks_fetch'):
+        jsonurl = urlopen(f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
+        jwks = json.loads(jsonurl.read())
     unverified_header = jwt.get_unverified_header(token)
     rsa_key = {}
     
@@ -70,13 +77,14 @@ def verify_decode_jwt(token):
     
     if rsa_key:
         try:
-            payload = jwt.decode(
-                token,
-                rsa_key,
-                algorithms=ALGORITHMS,
-                audience=API_AUDIENCE,
-                issuer=f'https://{AUTH0_DOMAIN}/'
-            )
+            with observe_stage('jwt_verify'):
+                payload = jwt.decode(
+                    token,
+                    rsa_key,
+                    algorithms=ALGORITHMS,
+                    audience=API_AUDIENCE,
+                    issuer=f'https://{AUTH0_DOMAIN}/'
+                )
             return payload
 
         except jwt.ExpiredSignatureError:
@@ -107,9 +115,27 @@ def requires_auth(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         try:
-            token = get_token_auth_header()
-            payload = verify_decode_jwt(token)
+            with observe_stage('requires_auth'):
+                token = get_token_auth_header()
+                payload = verify_decode_jwt(token)
+            g.current_user = payload
+            start_request_profile()
             return f(*args, **kwargs)
         except AuthError as e:
             return jsonify(e.error), e.status_code
-    return decorated 
\ No newline at end of file
+    return decorated
+
+def requires_permission(permission):
+    """Decorator to check the verified token grants a permission, use below requires_auth"""
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            payload = g.get('current_user') or {}
+            if permission not in payload.get('permissions', []):
+                raise AuthError({
+                    'code': 'unauthorized',
+                    'description': 'Permission not found.'
+                }, 403)
+            return f(*args, **kwargs)
+        return decorated
+    return decorator 
\ No newline at end of file
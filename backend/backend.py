@@ -1,10 +1,6 @@
-import pandas as pd
 import numpy as np
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, g, request, jsonify, render_template
 from flask_cors import CORS
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics.pairwise import cosine_similarity
-from anthropic import Anthropic
 from dotenv import load_dotenv
 import os
 import re
@@ -12,61 +8,91 @@ import json
 from datetime import datetime
 from fuzzywuzzy import fuzz
 from fuzzywuzzy import process
-from auth import requires_auth, AuthError
+from auth import requires_auth, requires_permission, AuthError
 from pathlib import Path
-from unc_scraper import UNCDiningScaper
+from catalog import Catalog
+import metrics
+from metrics import observe_stage, timed
+import profiler
+from plan_cache import PlanCache, cache_key
+from request_params import parse_bool, resolve_seed
+from responses import cached_response, json_response
+from llm_scheduler import CircuitBreaker, LLMOverloaded, LLMScheduler
 
 # Load environment variables
 load_dotenv()
 
-print(f"API Key loaded: {'*' * (len(os.getenv('ANTHROPIC_API_KEY')) - 8)}{os.getenv('ANTHROPIC_API_KEY')[-8:]}")
-
 app = Flask(__name__)
 CORS(app)
+metrics.init_app(app)
+profiler.init_app(app)
 
-# Initialize Anthropic client
-ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY')
-client = Anthropic(api_key=ANTHROPIC_API_KEY)
-
-# Load and preprocess the data
-df = pd.read_csv('Data_prep.csv')
-
-# Convert boolean columns to numeric and handle NaN values
-boolean_columns = ['Vegan', 'Made Without Gluten', 'Vegetarian', 'Organic', 'Halal', 'Breakfast', 'Lunch', 'Dinner']
-for col in boolean_columns:
-    df[col] = df[col].map({'T': 1, 'F': 0, True: 1, False: 0}).fillna(0)
+# Data files live next to this module, whatever the working directory
+BASE_DIR = Path(__file__).resolve().parent
+RATINGS_FILE = Path(os.getenv('VORA_RATINGS_FILE', BASE_DIR / 'ratings.json'))
 
-# Fill NaN values in numeric columns with mean
-numeric_columns = ['Calories', 'Total Fat', 'Total Carbohydrates', 'Protein']
-for col in numeric_columns:
-    df[col] = df[col].fillna(df[col].mean())
-
-# Create feature matrix for similarity calculation
-feature_cols = ['Calories', 'Total Fat', 'Total Carbohydrates', 'Protein', 'Vegan', 
-                'Made Without Gluten', 'Vegetarian', 'Organic', 'Halal']
-
-# Initialize the scaler
-features = df[feature_cols].values
-scaler = StandardScaler()
-features = scaler.fit_transform(features)
+# Anthropic client, created on first use so importing this module stays cheap
+ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY')
+client = None
+
+def get_client():
+    """Return the Anthropic client, creating it on first use"""
+    global client
+    if client is None:
+        if not ANTHROPIC_API_KEY:
+            raise RuntimeError('ANTHROPIC_API_KEY is not set')
+        from anthropic import Anthropic
+        print(f"API Key loaded: {'*' * (len(ANTHROPIC_API_KEY) - 8)}{ANTHROPIC_API_KEY[-8:]}")
+        # Retries are handled by llm_scheduler, so the client itself does not retry
+        client = Anthropic(api_key=ANTHROPIC_API_KEY, max_retries=0, timeout=float(os.getenv('VORA_LLM_TIMEOUT', '60')))
+    return client
+
+# Threads per gunicorn worker, see gunicorn.conf.py. Running and queued LLM calls each hold
+# a thread, so by default they take at most three quarters and meal plans keep the rest.
+WORKER_THREADS = int(os.getenv('GUNICORN_THREADS', '8'))
+
+# Bound concurrent LLM calls per worker and fail fast while the provider is unhealthy
+llm_scheduler = LLMScheduler(
+    max_concurrency=int(os.getenv('VORA_LLM_MAX_CONCURRENCY', str(max(WORKER_THREADS // 2, 1)))),
+    max_queue=int(os.getenv('VORA_LLM_MAX_QUEUE', str(WORKER_THREADS // 4))),
+    queue_timeout=float(os.getenv('VORA_LLM_QUEUE_TIMEOUT', '10')),
+    max_retries=int(os.getenv('VORA_LLM_MAX_RETRIES', '2')),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv('VORA_LLM_BREAKER_THRESHOLD', '5')),
+        reset_timeout=float(os.getenv('VORA_LLM_BREAKER_RESET', '30'))
+    )
+)
+
+if llm_scheduler.max_concurrency + llm_scheduler.max_queue >= WORKER_THREADS:
+    print(f"Warning: {llm_scheduler.max_concurrency} LLM calls plus {llm_scheduler.max_queue} queued "
+          f"can hold all {WORKER_THREADS} worker threads, other requests may wait behind chat")
+
+# Scraped menus are saved here so every worker loads them at startup
+SCRAPED_DIR = Path(os.getenv('VORA_SCRAPED_DIR', BASE_DIR / 'scraped_menus'))
+
+# Load the catalog, sharded by dining hall
+catalog = Catalog.from_csv(BASE_DIR / 'Data_prep.csv', scraped_dir=SCRAPED_DIR)
+
+# Serialized plans for seeded requests, keyed by preferences and catalog version
+plan_cache = PlanCache(max_entries=int(os.getenv('VORA_PLAN_CACHE_SIZE', '2048')))
 
 # Add ratings storage
 ratings_db = {}  # Format: {user_id: [{meal_name: str, rating: int, date: str}]}
 
 def load_ratings():
     """Load ratings from JSON file"""
-    ratings_file = Path('ratings.json')
-    if ratings_file.exists():
+    if RATINGS_FILE.exists():
         try:
-            with open(ratings_file, 'r') as f:
+            with open(RATINGS_FILE, 'r') as f:
                 return json.load(f)
         except json.JSONDecodeError:
             return {}
     return {}
 
+@timed('save_ratings')
 def save_ratings():
     """Save ratings to JSON file"""
-    with open('ratings.json', 'w') as f:
+    with open(RATINGS_FILE, 'w') as f:
         json.dump(ratings_db, f)
 
 # Initialize ratings from file
@@ -112,97 +138,70 @@ def extract_preferences_from_text(text):
     
     return preferences
 
-def get_dietary_restrictions_text(food_item):
-    """Get a formatted string of dietary restrictions for a food item"""
-    restrictions = []
-    if food_item['Vegan']:
-        restrictions.append('Vegan')
-    if food_item['Vegetarian']:
-        restrictions.append('Vegetarian')
-    if food_item['Made Without Gluten']:
-        restrictions.append('Gluten-Free')
-    if food_item['Halal']:
-        restrictions.append('Halal')
-    if food_item['Organic']:
-        restrictions.append('Organic')
-    return ', '.join(restrictions) if restrictions else 'None'
-
-def get_meal_recommendations(preferences):
-    """Generate meal recommendations based on user preferences with strict dietary restriction filtering"""
+@timed('get_meal_recommendations')
+def get_meal_recommendations(preferences, location=None, seed=None, use_table=True):
+    """Generate meal recommendations based on user preferences with strict dietary restriction filtering
+
+    Only the shard for the requested location is scored; with no location the
+    whole catalog is used. When the targets fall on the shard's plan table the
+    precomputed candidates are re-ranked instead of scoring every item. Passing
+    a seed makes the random variation, and so the plan, reproducible; seeded
+    plans always score the whole shard, because the variation is drawn per
+    candidate, so they match api/recommender.py for the same seed.
+    """
     try:
-        # Create user preference vector
-        user_pref = np.zeros(len(feature_cols))
-        
-        # Set dietary restrictions
-        dietary_mapping = {
-            'vegan': 'Vegan',
-            'gluten_free': 'Made Without Gluten',
-            'vegetarian': 'Vegetarian',
-            'halal': 'Halal'
-        }
-        
-        # Create a mask for filtering based on dietary restrictions
-        valid_items_mask = np.ones(len(df), dtype=bool)
-        
-        for pref_key, feature_key in dietary_mapping.items():
-            # Convert boolean values to bool type explicitly
-            pref_value = bool(preferences.get(pref_key, False))
-            if pref_value:
-                user_pref[feature_cols.index(feature_key)] = 1
-                # Strict filtering: only include items that match the dietary restriction
-                valid_items_mask &= (df[feature_key] == 1)
-                
-                # If vegan is selected, also enforce vegetarian
-                if pref_key == 'vegan':
-                    valid_items_mask &= (df['Vegetarian'] == 1)
-        
-        # Set nutritional preferences with higher weights for dietary restrictions
-        target_calories = float(preferences.get('target_calories', 2000)) / 3  # per meal
-        target_protein = float(preferences.get('target_protein', 50)) / 3  # per meal
-        
-        # Set calorie and protein targets in the preference vector
-        user_pref[feature_cols.index('Calories')] = target_calories
-        user_pref[feature_cols.index('Protein')] = target_protein
-        
-        # Normalize user preferences
-        user_pref_scaled = scaler.transform(user_pref.reshape(1, -1))[0]
-        
-        # Calculate similarity scores
-        similarity_scores = cosine_similarity([user_pref_scaled], features)[0]
-        
-        # Apply dietary restrictions mask
-        similarity_scores[~valid_items_mask] = -1
+        rng = np.random.default_rng(seed) if seed is not None else np.random
+
+        shard = catalog.get_shard(location)
+        if shard is None:
+            print(f"Unknown location in get_meal_recommendations: {location}")
+            return None
+
+        # Normalized user preference vector, scaled to unit length so scores are dot products
+        user_pref_scaled = catalog.preference_vector(preferences)
+        user_norm = np.linalg.norm(user_pref_scaled)
+        user_unit = user_pref_scaled / user_norm if user_norm else user_pref_scaled
+
+        # Precomputed candidates for this preference bucket, None when off the table's grid
+        table_candidates = None
+        if use_table and seed is None and shard.plan_table is not None:
+            table_candidates = shard.plan_table.lookup(preferences)
+
+        if table_candidates is None:
+            # Strict filtering: only include items that match every dietary restriction
+            valid_items_mask = shard.dietary_mask(preferences)
+
+            # Calculate similarity scores over the whole shard
+            with observe_stage('similarity'):
+                similarity_scores = shard.unit_features @ user_unit
         
         # Get recommendations for each meal type
         meal_plan = {}
         for meal_type in ['Breakfast', 'Lunch', 'Dinner']:
-            # Filter by meal type
-            meal_mask = df[meal_type] == 1
+            if table_candidates is not None:
+                candidates = table_candidates[meal_type]
+            else:
+                # Items for this meal type that satisfy all constraints
+                candidates = np.flatnonzero(valid_items_mask & shard.meal_masks[meal_type])
             
-            # Get top recommendations for each meal with some randomness
-            meal_scores = similarity_scores.copy()
-            meal_scores[~meal_mask] = -1
+            if len(candidates) == 0:
+                meal_plan[meal_type.lower()] = []
+                continue
             
-            # Add small random variation to scores to get different results each time
-            valid_meals = meal_scores > -1
-            meal_scores[valid_meals] += np.random.uniform(-0.1, 0.1, size=np.sum(valid_meals))
+            if table_candidates is not None:
+                # Re-rank the bucket's candidates exactly for this user's targets
+                with observe_stage('similarity'):
+                    meal_scores = shard.unit_features[candidates] @ user_unit
+            else:
+                meal_scores = similarity_scores[candidates]
             
-            # Get indices of top matches that satisfy all constraints
-            top_indices = np.argsort(meal_scores)[-5:][::-1]  # Get top 5
-            recommendations = []
+            # Add small random variation to scores to get different results each time
+            meal_scores = meal_scores + rng.uniform(-0.1, 0.1, size=len(candidates))
             
-            # Use all 5 top matches instead of randomly selecting 3
-            for idx in top_indices:
-                if meal_scores[idx] > -1:  # Only include valid recommendations
-                    food_item = df.iloc[idx]
-                    recommendations.append({
-                        'name': str(food_item['Food Name']),
-                        'calories': float(food_item['Calories']),
-                        'protein': float(food_item['Protein']),
-                        'carbs': float(food_item['Total Carbohydrates']),
-                        'fat': float(food_item['Total Fat']),
-                        'dietary_restrictions': get_dietary_restrictions_text(food_item)
-                    })
+            # Get indices of the top 5 matches
+            top_indices = candidates[np.argsort(meal_scores)[-5:][::-1]]
+            # Use all 5 top matches instead of randomly selecting 3, copied so callers can modify them
+            recommendations = [dict(shard.recommendations[idx]) for idx in top_indices]
             
             meal_plan[meal_type.lower()] = recommendations
         
@@ -300,32 +299,50 @@ EXAMPLE RESPONSE FORMAT:
         summary += "-------------------------------------------"
         return summary
 
-    def generate_response(self, user_message: str) -> dict:
+    def degraded_response(self, preferences, location=None) -> dict:
+        """Response built from the local meal plan alone, used while the LLM is unavailable"""
+        meal_plan = get_meal_recommendations(preferences, location)
+        message = "⚠️ **Our assistant is temporarily unavailable**\\n\\n"
+        message += "• Here is a meal plan based on your message in the meantime\\n"
+        if meal_plan:
+            message += self.format_meal_summary(meal_plan)
+        
+        return {
+            "message": message.replace('\\n', '\n'),
+            "meal_plan": meal_plan,
+            "extracted_preferences": preferences,
+            "degraded": True
+        }
+
+    @timed('ChatBot.generate_response')
+    def generate_response(self, user_message: str, location=None) -> dict:
         try:
             # Extract preferences from user message
             preferences = extract_preferences_from_text(user_message)
             
-            # Add user message to context
-            self.add_to_context("user", user_message)
-            
-            # Get available foods for context
-            available_foods = set(df['Food Name'].tolist())
+            # Get available foods for context, limited to the requested dining hall
+            shard = catalog.get_shard(location) or catalog.full
+            available_foods = set(shard.df['Food Name'].tolist())
             
-            # Format context for Claude
+            # Format context for Claude, the user message joins the stored context only once the call succeeds
+            recent = self.context[-4:] + [{"role": "user", "content": user_message}]
             formatted_context = "\\n\\n\\n".join([
                 f"{msg['role'].capitalize()}: {msg['content']}" 
-                for msg in self.context[-5:]
+                for msg in recent
             ])
             
-            # Get response from Claude
-            message = client.messages.create(
-                model="claude-3-opus-20240229",
-                max_tokens=2000,
-                temperature=0.7,
-                system=self.system_prompt,
-                messages=[{
-                    "role": "user",
-                    "content": f"""Previous conversation:
+            # Get response from Claude, or only the local meal plan when the LLM is unavailable
+            try:
+                with observe_stage('llm_call'):
+                    message = llm_scheduler.call(
+                        get_client().messages.create,
+                        model="claude-3-opus-20240229",
+                        max_tokens=2000,
+                        temperature=0.7,
+                        system=self.system_prompt,
+                        messages=[{
+                            "role": "user",
+                            "content": f"""Previous conversation:
                     {formatted_context}
 
                     Current message: {user_message}
@@ -341,14 +358,20 @@ EXAMPLE RESPONSE FORMAT:
                     • Indentation for sub-points (two spaces)
                     • Never use paragraphs - always use lists
                     • Add horizontal lines between major sections (---)"""
-                }]
-            )
+                        }]
+                    )
+            except LLMOverloaded:
+                raise
+            except Exception as e:
+                # Circuit open, retries exhausted or a non-retryable error
+                print(f"LLM unavailable in generate_response: {str(e)}")
+                return self.degraded_response(preferences, location)
             
             # Extract the response text and ensure proper line breaks
             assistant_response = message.content[0].text if hasattr(message.content[0], 'text') else str(message.content)
             
             # Always generate a meal plan based on the conversation
-            meal_plan = get_meal_recommendations(preferences)
+            meal_plan = get_meal_recommendations(preferences, location)
             
             # If meal plan was generated, add it to the response
             if meal_plan:
@@ -356,7 +379,8 @@ EXAMPLE RESPONSE FORMAT:
                 if "meal plan" not in assistant_response.lower():
                     assistant_response += "\\n\\n\\n" + meal_summary
             
-            # Add assistant's response to context
+            # Add the exchange to context
+            self.add_to_context("user", user_message)
             self.add_to_context("assistant", assistant_response)
             
             # Process the response to ensure proper line breaks
@@ -368,6 +392,9 @@ EXAMPLE RESPONSE FORMAT:
                 "extracted_preferences": preferences
             }
             
+        except LLMOverloaded:
+            # Let the endpoint answer 429 so the client backs off
+            raise
         except Exception as e:
             print(f"Error in generate_response: {str(e)}")
             import traceback
@@ -381,8 +408,16 @@ EXAMPLE RESPONSE FORMAT:
 # Initialize chatbot
 chatbot = ChatBot()
 
-# Add this after other imports
-scraper = UNCDiningScaper()
+# Selenium is only needed for scraping, so the scraper is created on first use
+scraper = None
+
+def get_scraper():
+    """Return the menu scraper, importing selenium on first use"""
+    global scraper
+    if scraper is None:
+        from unc_scraper import UNCDiningScaper
+        scraper = UNCDiningScaper()
+    return scraper
 
 @app.route('/')
 def home():
@@ -394,25 +429,48 @@ def handle_auth_error(ex):
     response.status_code = ex.status_code
     return response
 
-@app.route('/get_meal_plan', methods=['POST'])
+@app.route('/get_meal_plan', methods=['GET', 'POST'])
 @requires_auth
 def get_meal_plan():
     try:
-        data = request.json
+        # GET takes the same fields as query parameters so browsers can revalidate with the ETag
+        data = request.args if request.method == 'GET' else request.json
         preferences = {
-            'vegan': data.get('vegan', False),
-            'vegetarian': data.get('vegetarian', False),
-            'gluten_free': data.get('gluten_free', False),
-            'halal': data.get('halal', False),
+            'vegan': parse_bool(data.get('vegan', False)),
+            'vegetarian': parse_bool(data.get('vegetarian', False)),
+            'gluten_free': parse_bool(data.get('gluten_free', False)),
+            'halal': parse_bool(data.get('halal', False)),
             'target_calories': float(data.get('target_calories', 2000)),
             'target_protein': float(data.get('target_protein', 50))
         }
         
-        meal_plan = get_meal_recommendations(preferences)
-        if meal_plan is None:
-            return jsonify({'error': 'Failed to generate meal plan'}), 500
+        location = data.get('location')
+        shard = catalog.get_shard(location)
+        if shard is None:
+            return jsonify({'error': f'Unknown location: {location}'}), 400
+        
+        try:
+            # 'daily' plans are keyed by the verified token subject, not a header the client controls
+            seed = resolve_seed(data.get('seed'), g.current_user.get('sub'))
+        except ValueError:
+            return jsonify({'error': "seed must be a non-negative integer or 'daily'"}), 400
+        
+        # Unseeded plans are random on purpose, so only seeded plans are cached
+        if seed is None:
+            meal_plan = get_meal_recommendations(preferences, location)
+            if meal_plan is None:
+                return jsonify({'error': 'Failed to generate meal plan'}), 500
+            return json_response(meal_plan)
+        
+        key = cache_key(preferences, shard.location, seed, shard.version)
+        entry = plan_cache.get(key)
+        if entry is None:
+            meal_plan = get_meal_recommendations(preferences, location, seed=seed)
+            if meal_plan is None:
+                return jsonify({'error': 'Failed to generate meal plan'}), 500
+            entry = plan_cache.put(key, meal_plan)
             
-        return jsonify(meal_plan)
+        return cached_response(entry)
     except Exception as e:
         print(f"Error in get_meal_plan: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -423,9 +481,22 @@ def chat():
     try:
         data = request.json
         user_message = data.get('message', '')
+        location = data.get('location')
+        
+        if location and catalog.get_shard(location) is None:
+            return jsonify({'error': f'Unknown location: {location}'}), 400
         
         # Generate response using chatbot
-        response = chatbot.generate_response(user_message)
+        try:
+            response = chatbot.generate_response(user_message, location)
+        except LLMOverloaded as e:
+            overloaded = jsonify({
+                'error': 'Too many chat requests',
+                'message': "I'm helping a lot of people right now. Please try again in a few seconds."
+            })
+            overloaded.status_code = 429
+            overloaded.headers['Retry-After'] = str(e.retry_after)
+            return overloaded
         
         return jsonify(response)
         
@@ -437,6 +508,28 @@ def chat():
                       "Could you please rephrase or try again?"
         }), 500
 
+@app.route('/locations', methods=['GET'])
+@requires_auth
+def get_locations():
+    try:
+        locations = []
+        for location in catalog.locations:
+            shard = catalog.shards[location]
+            locations.append({
+                'id': location,
+                'items': len(shard),
+                'plan_table_bytes': shard.plan_table.nbytes if shard.plan_table is not None else 0
+            })
+        
+        return jsonify({
+            'locations': locations,
+            'plan_table_bytes': catalog.plan_table_bytes,
+            'plan_table_max_bytes': catalog.plan_table_max_bytes
+        })
+    except Exception as e:
+        print(f"Error in get_locations: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/add_rating', methods=['POST'])
 @requires_auth
 def add_rating():
@@ -496,6 +589,7 @@ def get_user_ratings():
 
 @app.route('/scrape_menu', methods=['POST'])
 @requires_auth
+@requires_permission('admin:catalog')
 def scrape_menu():
     try:
         data = request.json
@@ -509,14 +603,20 @@ def scrape_menu():
             return jsonify({'error': 'Invalid URL format'}), 400
             
         # Update scraper URL and scrape
-        scraper.base_url = url
-        menu_data = scraper.scrape_menu()
+        menu_scraper = get_scraper()
+        menu_scraper.base_url = url
+        with observe_stage('scrape_menu'):
+            menu_data = menu_scraper.scrape_menu()
         
         if menu_data is None:
             return jsonify({'error': 'Failed to scrape menu data'}), 500
+        
+        # Shard the scraped items by location, leaving other locations untouched
+        locations = catalog.add_scraped_menu(menu_data)
             
         return jsonify({
             'message': 'Menu scraped successfully',
+            'locations': locations,
             'data': menu_data.to_dict('records')
         })
         
@@ -524,5 +624,32 @@ def scrape_menu():
         print(f"Error scraping menu: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/admin/profile', methods=['POST'])
+@requires_auth
+@requires_permission(profiler.PROFILE_PERMISSION)
+def profile_worker():
+    try:
+        data = request.get_json(silent=True) or {}
+        seconds = float(data.get('seconds', 10))
+        interval = float(data.get('interval_ms', profiler.DEFAULT_INTERVAL * 1000)) / 1000
+        
+        if seconds <= 0 or interval <= 0:
+            return jsonify({'error': 'seconds and interval_ms must be positive'}), 400
+        
+        # Blocks this request while the other threads of this worker are sampled,
+        # so run gunicorn with threads > 1 to profile concurrent traffic
+        sampler = profiler.profile_for(seconds, interval)
+        
+        return Response(sampler.collapsed(), mimetype='text/plain', headers={
+            'X-Vora-Profile-Samples': str(sampler.samples),
+            'X-Vora-Profile-Pid': str(os.getpid())
+        })
+    except Exception as e:
+        print(f"Error in profile_worker: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 if __name__ == '__main__':
+    # The reloader runs the app in a child process, serve metrics from that one only
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        metrics.start_metrics_server()
     app.run(host='0.0.0.0', port=8000, debug=True)
@@ -0,0 +1,119 @@
+"""Check that plan table lookups match exact scoring within a tolerance
+
+For random preferences on every shard, compares the top recommendations per
+meal (without the random jitter) from the precomputed plan table against
+scoring the whole shard. It then adds the same random jitter production does
+and checks that every top pick of the exact path lies inside the bucket's
+stored candidates, i.e. the table path would have returned the same plan.
+Also reports the table memory use. Exits non-zero when either check fails.
+
+    cd backend
+    python benchmarks/check_plan_table.py --catalog-sizes 0 2000
+"""
+import argparse
+import random
+import sys
+
+import numpy as np
+
+from harness import BACKEND_DIR
+from synthetic_catalog import generate_catalog
+
+sys.path.insert(0, str(BACKEND_DIR))
+
+from catalog import Catalog  # noqa: E402
+from plan_table import CALORIE_GRID, PROTEIN_GRID, restriction_keys, unit_rows  # noqa: E402
+
+def random_preferences(rng):
+    preferences = {key: rng.random() < 0.25 for key in restriction_keys}
+    preferences['target_calories'] = rng.uniform(CALORIE_GRID[0], CALORIE_GRID[-1])
+    preferences['target_protein'] = rng.uniform(PROTEIN_GRID[0], PROTEIN_GRID[-1])
+    return preferences
+
+def top_scores(user, features, candidates, n):
+    """Best n cosine similarities among candidates, highest first"""
+    if len(candidates) == 0:
+        return np.array([]), set()
+    scores = unit_rows(features[candidates]) @ user
+    order = np.argsort(scores)[-n:][::-1]
+    return scores[order], set(candidates[order].tolist())
+
+def check_shard(catalog, shard, rng, samples, n):
+    """Largest score gap and mean overlap between table and exact top-n for one shard"""
+    worst_gap = 0.0
+    overlaps = []
+    for _ in range(samples):
+        preferences = random_preferences(rng)
+        user = unit_rows(catalog.preference_vector(preferences).reshape(1, -1))[0]
+        valid = shard.dietary_mask(preferences)
+        table_candidates = shard.plan_table.lookup(preferences)
+
+        for meal_type, meal_mask in shard.meal_masks.items():
+            exact, exact_items = top_scores(user, shard.features, np.flatnonzero(valid & meal_mask), n)
+            table, table_items = top_scores(user, shard.features, table_candidates[meal_type], n)
+            if len(exact) != len(table):
+                return float('inf'), 0.0
+            if len(exact):
+                worst_gap = max(worst_gap, float(np.max(np.abs(exact - table))))
+                overlaps.append(len(exact_items & table_items) / len(exact_items))
+    return worst_gap, float(np.mean(overlaps)) if overlaps else 1.0
+
+def check_jittered(catalog, shard, rng, samples, n):
+    """Exact-path top-n picks with jitter that fall outside the table bucket, and total picks"""
+    outside = 0
+    total = 0
+    for _ in range(samples):
+        preferences = random_preferences(rng)
+        scores = unit_rows(shard.features) @ unit_rows(catalog.preference_vector(preferences).reshape(1, -1))[0]
+        valid = shard.dietary_mask(preferences)
+        table_candidates = shard.plan_table.lookup(preferences)
+        jitter = np.random.default_rng(rng.getrandbits(32))
+
+        for meal_type, meal_mask in shard.meal_masks.items():
+            candidates = np.flatnonzero(valid & meal_mask)
+            # Same variation as get_meal_recommendations adds before taking the top picks
+            meal_scores = scores[candidates] + jitter.uniform(-0.1, 0.1, size=len(candidates))
+            picks = candidates[np.argsort(meal_scores)[-n:]]
+            outside += len(np.setdiff1d(picks, table_candidates[meal_type]))
+            total += len(picks)
+    return outside, total
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--catalog-sizes', nargs='+', type=int, default=[0, 2000],
+                        help='synthetic catalog sizes, 0 checks Data_prep.csv itself')
+    parser.add_argument('--samples', type=int, default=300, help='random preferences per shard')
+    parser.add_argument('--top', type=int, default=5, help='recommendations per meal')
+    parser.add_argument('--tolerance', type=float, default=0.02, help='allowed cosine similarity gap')
+    parser.add_argument('--max-outside', type=float, default=0.0,
+                        help='allowed fraction of jittered exact-path picks outside the table bucket')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    failed = False
+
+    print(f"{'catalog':>8} {'shard':<10}{'items':>7}{'table bytes':>13}{'max gap':>10}{'overlap':>9}{'outside':>14}")
+    for size in args.catalog_sizes:
+        frame = generate_catalog(size, seed=args.seed) if size else None
+        catalog = Catalog(frame) if frame is not None else Catalog.from_csv(BACKEND_DIR / 'Data_prep.csv')
+
+        for shard in [catalog.full, *catalog.shards.values()]:
+            if shard.plan_table is None:
+                print(f"{size or 'csv':>8} {shard.location:<10}{len(shard):>7}{'skipped':>13}")
+                continue
+            gap, overlap = check_shard(catalog, shard, rng, args.samples, args.top)
+            outside, total = check_jittered(catalog, shard, rng, args.samples, args.top)
+            within = gap <= args.tolerance and outside <= args.max_outside * total
+            status = 'ok' if within else 'FAIL'
+            failed |= not within
+            print(f"{size or 'csv':>8} {shard.location:<10}{len(shard):>7}{shard.plan_table.nbytes:>13}"
+                  f"{gap:>10.4f}{overlap:>9.2%}{f'{outside}/{total}':>14}  {status}")
+
+        print(f"{size or 'csv':>8} {'total':<10}{'':>7}{catalog.plan_table_bytes:>13}"
+              f"  (budget {catalog.plan_table_max_bytes})")
+
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
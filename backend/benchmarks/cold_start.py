@@ -0,0 +1,130 @@
+"""Cold-start time and bundle size of the serverless entry point vs the full backend
+
+Each measurement runs in a fresh interpreter. The serverless entry
+(api/backend.py) is timed through import, its auth stack and its first meal
+plan. The full backend (backend/backend.py) is timed through import plus the
+anthropic and selenium imports it now defers, i.e. what importing it cost
+before lazy initialization. Bundle size is the on-disk size of the packages
+and files each process loaded.
+
+    cd backend
+    python export_artifact.py
+    python benchmarks/cold_start.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from harness import BACKEND_DIR
+
+API_DIR = BACKEND_DIR.parent / 'api'
+
+CHILD = r'''
+import contextlib, importlib.util, json, os, sys, sysconfig, time
+from pathlib import Path
+
+entry, api_dir, backend_dir = sys.argv[1], sys.argv[2], sys.argv[3]
+start = time.perf_counter()
+with contextlib.redirect_stdout(sys.stderr):
+    if entry == 'serverless':
+        sys.path.insert(0, api_dir)
+        spec = importlib.util.spec_from_file_location('backend', os.path.join(api_dir, 'backend.py'))
+    else:
+        sys.path.insert(0, backend_dir)
+        os.environ.setdefault('VORA_RATINGS_FILE', os.devnull)
+        spec = importlib.util.spec_from_file_location('backend', os.path.join(backend_dir, 'backend.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['backend'] = module
+    spec.loader.exec_module(module)
+    import_seconds = time.perf_counter() - start
+
+    first_use_seconds = None
+    if entry == 'serverless':
+        first = time.perf_counter()
+        # An unauthenticated request pulls in the auth stack, then a plan loads the artifact
+        module.app.test_client().post('/api/get_meal_plan', json={})
+        module.get_recommender().get_meal_plan({'target_calories': 2000, 'target_protein': 50})
+        first_use_seconds = time.perf_counter() - first
+    else:
+        import anthropic
+        module.get_scraper()
+        import_seconds = time.perf_counter() - start
+
+# Size of every package or project file the process loaded
+site_dirs = {Path(p).resolve() for p in (sysconfig.get_paths()['purelib'], sysconfig.get_paths()['platlib'])}
+roots = set()
+for name, mod in list(sys.modules.items()):
+    path = getattr(mod, '__file__', None)
+    if not path:
+        continue
+    path = Path(path).resolve()
+    for site in site_dirs:
+        if site in path.parents:
+            roots.add(site / path.relative_to(site).parts[0])
+            break
+    else:
+        if Path(api_dir).resolve() in path.parents or Path(backend_dir).resolve() in path.parents:
+            roots.add(path)
+if entry == 'serverless':
+    roots.add(Path(api_dir) / 'recommender.npz')
+
+def size(path):
+    if path.is_file():
+        return path.stat().st_size
+    return sum(f.stat().st_size for f in path.rglob('*') if f.is_file())
+
+print(json.dumps({
+    'import_seconds': import_seconds,
+    'first_use_seconds': first_use_seconds,
+    'bundle_bytes': sum(size(root) for root in roots),
+    'packages': sorted(root.name for root in roots if root.is_dir())
+}))
+'''
+
+def measure(entry):
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD, entry, str(API_DIR), str(BACKEND_DIR)],
+        capture_output=True, text=True, env=env, cwd=BACKEND_DIR
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{entry} run failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-ratio', type=float, default=0.5,
+                        help='fail if serverless cold start or bundle exceeds this fraction of the full backend')
+    args = parser.parse_args()
+
+    if not (API_DIR / 'recommender.npz').exists():
+        print("api/recommender.npz is missing, run export_artifact.py first")
+        return 1
+
+    # One warm-up run each so the OS file cache does not favour whichever runs second
+    measure('serverless')
+    measure('full')
+    serverless = [measure('serverless') for _ in range(args.runs)]
+    full = [measure('full') for _ in range(args.runs)]
+
+    slim_cold = statistics.median(r['import_seconds'] + r['first_use_seconds'] for r in serverless)
+    full_cold = statistics.median(r['import_seconds'] for r in full)
+    slim_bundle = serverless[0]['bundle_bytes']
+    full_bundle = full[0]['bundle_bytes']
+
+    print(f"{'':<28}{'serverless':>14}{'full':>14}{'ratio':>8}")
+    print(f"{'cold start (median s)':<28}{slim_cold:>14.3f}{full_cold:>14.3f}{slim_cold / full_cold:>8.2f}")
+    print(f"{'bundle (MB)':<28}{slim_bundle / 1e6:>14.1f}{full_bundle / 1e6:>14.1f}{slim_bundle / full_bundle:>8.2f}")
+    print(f"\nserverless loads: {', '.join(serverless[0]['packages'])}")
+
+    if slim_cold / full_cold > args.max_ratio or slim_bundle / full_bundle > args.max_ratio:
+        print(f"\nServerless entry is above {args.max_ratio:.0%} of the full backend")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from stub_anthropic import StubAnthropic
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Local test key used in place of the Auth0 JWKS
+TEST_SECRET = 'vora-benchmark-secret'
+TEST_ALGORITHM = 'HS256'
+
+def mint_token(subject='benchmark-user', permissions=()):
+    """Sign a token that the patched verifier accepts"""
+    from jose import jwt
+    import auth
+
+    now = int(time.time())
+    return jwt.encode({
+        'sub': subject,
+        'aud': auth.API_AUDIENCE,
+        'iss': f'https://{auth.AUTH0_DOMAIN}/',
+        'iat': now,
+        'exp': now + 24 * 3600,
+        'permissions': list(permissions)
+    }, TEST_SECRET, algorithm=TEST_ALGORITHM)
+
+def verify_with_test_key(token):
+    """Drop-in for auth.verify_decode_jwt that checks against the local test key"""
+    from jose import jwt
+    import auth
+
+    try:
+        return jwt.decode(
+            token,
+            TEST_SECRET,
+            algorithms=[TEST_ALGORITHM],
+            audience=auth.API_AUDIENCE,
+            issuer=f'https://{auth.AUTH0_DOMAIN}/'
+        )
+    except Exception:
+        raise auth.AuthError({
+            'code': 'invalid_header',
+            'description': 'Unable to parse authentication token.'
+        }, 400)
+
+def load_app(catalog=None, llm_latency=0.0, llm_client=None):
+    """Import the Flask backend with auth, the LLM client and the catalog swapped for local ones
+
+    Returns the backend module. Ratings and scraped menus are written to a
+    temporary directory so benchmark runs never touch backend/.
+    """
+    scratch = tempfile.mkdtemp(prefix='vora-bench-')
+    os.environ['VORA_RATINGS_FILE'] = os.path.join(scratch, 'ratings.json')
+    os.environ['VORA_SCRAPED_DIR'] = os.path.join(scratch, 'scraped_menus')
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+
+    import auth
+    import backend
+    from catalog import Catalog
+
+    auth.verify_decode_jwt = verify_with_test_key
+    backend.client = llm_client if llm_client is not None else StubAnthropic(llm_latency)
+    if catalog is not None:
+        backend.catalog = Catalog(catalog)
+
+    backend.ratings_db = {}
+    return backend
@@ -0,0 +1,57 @@
+"""Burst /chat against a fake LLM API to exercise admission control
+
+Sends a burst of concurrent chat requests while the stub LLM adds latency
+and fails a share of calls, then reports how many were answered, rejected
+with 429, or degraded to the local meal plan by the circuit breaker.
+
+    cd backend
+    VORA_LLM_MAX_CONCURRENCY=2 VORA_LLM_MAX_QUEUE=4 VORA_LLM_QUEUE_TIMEOUT=1 \\
+        python benchmarks/llm_burst.py --requests 40 --llm-latency 0.5 --error-rate 0.5
+"""
+import argparse
+import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from harness import load_app, mint_token
+from stub_anthropic import StubAnthropic
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--llm-latency', type=float, default=0.5)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=529)
+    args = parser.parse_args()
+
+    llm = StubAnthropic(args.llm_latency, args.error_rate, args.error_status)
+    backend = load_app(llm_client=llm)
+    # Retry quickly so the burst finishes in seconds
+    backend.llm_scheduler.backoff_base = 0.05
+    headers = {'Authorization': f'Bearer {mint_token()}'}
+
+    def send(i):
+        client = backend.app.test_client()
+        response = client.post('/chat', json={'message': 'vegan lunch with 2000 calories'}, headers=headers)
+        if response.status_code == 429:
+            return f"429 (Retry-After {response.headers.get('Retry-After')})"
+        if response.status_code == 200 and response.json.get('degraded'):
+            return '200 degraded'
+        if response.status_code == 200 and response.json.get('meal_plan') is None:
+            return '200 error message'
+        return str(response.status_code)
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        outcomes = Counter(pool.map(send, range(args.requests)))
+
+    for outcome, count in sorted(outcomes.items()):
+        print(f"{outcome:<28}{count:>5}")
+    print(f"{'LLM calls':<28}{llm.messages.calls:>5}")
+    print(f"{'LLM errors injected':<28}{llm.messages.errors:>5}")
+    print(f"{'max concurrent LLM calls':<28}{llm.messages.max_in_flight:>5}")
+    print(f"{'circuit breaker':<28}{backend.llm_scheduler.breaker.state:>5}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Time get_meal_recommendations with and without the precomputed plan table
+
+For every shard of each catalog, runs the same random preferences through the
+plan table path and the exact path that scores the whole shard, and fails if
+the table is not faster on a shard that has one. Also reports how long the
+catalog, including its plan tables, took to build.
+
+    cd backend
+    python benchmarks/plan_table_speed.py --catalog-sizes 0 5000 20000
+"""
+import argparse
+import random
+import sys
+import time
+
+from harness import load_app
+from synthetic_catalog import generate_catalog
+
+def random_preferences(rng):
+    return {
+        'vegan': rng.random() < 0.2,
+        'vegetarian': rng.random() < 0.3,
+        'gluten_free': rng.random() < 0.2,
+        'halal': rng.random() < 0.2,
+        'target_calories': rng.choice([1500, 1800, 2000, 2500, 3000]),
+        'target_protein': rng.choice([40, 60, 100, 150])
+    }
+
+def time_calls(backend, preferences, location, use_table):
+    """Mean milliseconds per get_meal_recommendations call"""
+    start = time.perf_counter()
+    for prefs in preferences:
+        backend.get_meal_recommendations(prefs, location, use_table=use_table)
+    return (time.perf_counter() - start) / len(preferences) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--catalog-sizes', nargs='+', type=int, default=[0, 5000],
+                        help='synthetic catalog sizes, 0 uses Data_prep.csv itself')
+    parser.add_argument('--calls', type=int, default=200, help='calls per shard and path')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    backend = load_app()
+    from catalog import Catalog
+
+    rng = random.Random(args.seed)
+    preferences = [random_preferences(rng) for _ in range(args.calls)]
+    failed = False
+
+    print(f"{'catalog':>8} {'shard':<10}{'items':>7}{'build s':>9}{'table ms':>10}{'exact ms':>10}{'speedup':>9}")
+    for size in args.catalog_sizes:
+        start = time.perf_counter()
+        backend.catalog = Catalog(generate_catalog(size, seed=args.seed)) if size else \
+            Catalog.from_csv(backend.BASE_DIR / 'Data_prep.csv')
+        build = time.perf_counter() - start
+
+        for shard in [backend.catalog.full, *backend.catalog.shards.values()]:
+            location = None if shard is backend.catalog.full else shard.location
+            # One warm-up pass so both paths run with warm caches
+            time_calls(backend, preferences[:10], location, True)
+            exact = time_calls(backend, preferences, location, False)
+            if shard.plan_table is None:
+                print(f"{size or 'csv':>8} {shard.location:<10}{len(shard):>7}{build:>9.1f}{'no table':>10}{exact:>10.3f}")
+                continue
+            table = time_calls(backend, preferences, location, True)
+            status = 'ok' if table < exact else 'SLOWER'
+            failed |= status == 'SLOWER'
+            print(f"{size or 'csv':>8} {shard.location:<10}{len(shard):>7}{build:>9.1f}{table:>10.3f}{exact:>10.3f}"
+                  f"{exact / table:>8.1f}x  {status}")
+
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""Endpoint load test and regression check for the Flask backend
+
+Runs in-process against the real app with requires_auth verifying a local
+test key and the Anthropic client replaced by a stub, over synthetic
+catalogs with the Data_prep.csv schema.
+
+    cd backend
+    python benchmarks/run_benchmarks.py --save-baseline
+    python benchmarks/run_benchmarks.py            # fails if slower than the baseline
+"""
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from harness import load_app, mint_token
+from synthetic_catalog import generate_catalog
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+ENDPOINTS = ['get_meal_plan', 'get_meal_plan_seeded', 'chat', 'add_rating', 'get_user_ratings']
+
+CHAT_MESSAGES = [
+    "I'm vegan and want about 2200 calories a day",
+    "Suggest a high protein lunch, around 150g of protein per day",
+    "What can I eat that is gluten free and halal?",
+    "I want a vegetarian dinner under 600 calories"
+]
+
+def make_request(endpoint, rng):
+    """Build (method, path, json_body) for one request to an endpoint"""
+    if endpoint in ('get_meal_plan', 'get_meal_plan_seeded'):
+        body = {
+            'vegan': rng.random() < 0.2,
+            'vegetarian': rng.random() < 0.3,
+            'gluten_free': rng.random() < 0.2,
+            'halal': rng.random() < 0.2,
+            'target_calories': rng.choice([1500, 1800, 2000, 2500, 3000]),
+            'target_protein': rng.choice([40, 60, 100, 150])
+        }
+        # The seeded variant exercises the plan cache, as repeat loads of the meal plan tab would
+        if endpoint == 'get_meal_plan_seeded':
+            body['seed'] = 'daily'
+        return 'POST', '/get_meal_plan', body
+    if endpoint == 'chat':
+        return 'POST', '/chat', {'message': rng.choice(CHAT_MESSAGES)}
+    if endpoint == 'add_rating':
+        return 'POST', '/add_rating', {'meal_name': f"Synthetic Item {rng.randrange(100)}", 'rating': rng.randint(1, 5)}
+    if endpoint == 'get_user_ratings':
+        return 'GET', '/get_user_ratings', None
+    raise ValueError(f"Unknown endpoint: {endpoint}")
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+def run_load(app, endpoint, n_requests, concurrency, tokens, seed, warmup):
+    """Drive one endpoint with a fixed number of requests spread over worker threads"""
+    counter = iter(range(n_requests))
+    lock = threading.Lock()
+    errors = []
+
+    def worker(worker_id):
+        client = app.test_client()
+        rng = random.Random(seed * 1000 + worker_id)
+        # Daily seeds follow the token subject, so each simulated user has its own token
+        user = worker_id % len(tokens)
+        headers = {'Authorization': f'Bearer {tokens[user]}', 'X-User-Id': f"bench-user-{user}"}
+        latencies = []
+
+        for _ in range(warmup):
+            method, path, body = make_request(endpoint, rng)
+            client.open(path, method=method, json=body, headers=headers)
+
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    break
+            method, path, body = make_request(endpoint, rng)
+            start = time.perf_counter()
+            response = client.open(path, method=method, json=body, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for result in results for latency in result)
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'throughput_rps': len(latencies) / elapsed if elapsed else 0.0
+    }
+
+def compare(results, baseline, tolerance):
+    """Regressions where p95 grew or throughput dropped by more than tolerance"""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{key}: p95 {previous['p95_ms']:.2f}ms -> {current['p95_ms']:.2f}ms")
+        if current['throughput_rps'] < previous['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{key}: throughput {previous['throughput_rps']:.1f} -> {current['throughput_rps']:.1f} req/s")
+    return regressions
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoints', nargs='+', default=ENDPOINTS, choices=ENDPOINTS)
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 8])
+    parser.add_argument('--catalog-sizes', nargs='+', type=int, default=[200, 5000])
+    parser.add_argument('--requests', type=int, default=200, help='requests per endpoint and configuration')
+    parser.add_argument('--warmup', type=int, default=5, help='unmeasured requests per worker thread')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='seconds the stub LLM waits per call')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='write results to the baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown before failing')
+    parser.add_argument('--output', type=Path, help='also write results as JSON')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    backend = None
+    tokens = None
+    results = {}
+
+    print(f"{'endpoint':<22}{'items':>7}{'conc':>6}{'reqs':>7}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+    for size in args.catalog_sizes:
+        catalog = generate_catalog(size, seed=args.seed)
+        if backend is None:
+            backend = load_app(catalog, llm_latency=args.llm_latency)
+            tokens = [mint_token(f"bench-user-{i}") for i in range(8)]
+        else:
+            from catalog import Catalog
+            backend.catalog = Catalog(catalog)
+
+        for endpoint in args.endpoints:
+            for concurrency in args.concurrency:
+                stats = run_load(backend.app, endpoint, args.requests, concurrency, tokens, args.seed, args.warmup)
+                results[f"{endpoint}|{size}|{concurrency}"] = stats
+                print(f"{endpoint:<22}{size:>7}{concurrency:>6}{stats['requests']:>7}{stats['errors']:>5}"
+                      f"{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['throughput_rps']:>10.1f}")
+
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}, run with --save-baseline to create one")
+        return 0
+
+    regressions = compare(results, json.loads(args.baseline.read_text())['results'], args.tolerance)
+    if regressions:
+        print("\nPerformance regressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+
+    print("\nNo regressions against baseline")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
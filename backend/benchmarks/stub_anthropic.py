@@ -0,0 +1,58 @@
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+STUB_REPLY = """🍽️ **Meal Suggestions**\\n\\n
+
+• Grilled chicken with roasted vegetables\\n
+  • High in protein\\n\\n\\n
+
+---"""
+
+class StubAPIError(Exception):
+    """Error carrying a status code, like the anthropic APIStatusError family"""
+
+    def __init__(self, status_code):
+        super().__init__(f"Stub API error {status_code}")
+        self.status_code = status_code
+
+class StubMessages:
+    def __init__(self, latency, error_rate, error_status, seed):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def create(self, **kwargs):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            if fail:
+                raise StubAPIError(self.error_status)
+            return SimpleNamespace(content=[SimpleNamespace(type='text', text=STUB_REPLY)])
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+class StubAnthropic:
+    """Stands in for anthropic.Anthropic, replying with a canned message after a fixed delay
+
+    A share of calls (error_rate) fails with a StubAPIError carrying
+    error_status, e.g. 529 for provider overload.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, error_status=529, seed=0):
+        self.messages = StubMessages(latency, error_rate, error_status, seed)
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from harness import BACKEND_DIR
+
+def generate_catalog(n_items, seed=0, source=None):
+    """Generate a catalog with the Data_prep.csv schema and matching column statistics
+
+    Numeric columns are drawn from a normal distribution with the source
+    column's mean and standard deviation, and every T/F column keeps the
+    source column's share of 'T' values.
+    """
+    source = pd.read_csv(source or BACKEND_DIR / 'Data_prep.csv')
+    rng = np.random.default_rng(seed)
+    catalog = {}
+
+    for col in source.columns:
+        values = source[col]
+        if col == 'Food Name':
+            catalog[col] = [f"Synthetic Item {i}" for i in range(n_items)]
+        elif col == 'Allergens':
+            choices = values.fillna('').unique()
+            catalog[col] = rng.choice(choices, size=n_items)
+        elif pd.api.types.is_numeric_dtype(values):
+            mean = values.mean()
+            std = values.std() if len(values) > 1 else 0.0
+            catalog[col] = np.clip(rng.normal(mean, std, size=n_items), 0, None).round(1)
+        else:
+            share = (values == 'T').mean()
+            catalog[col] = np.where(rng.random(n_items) < share, 'T', 'F')
+
+    return pd.DataFrame(catalog, columns=source.columns)
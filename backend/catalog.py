@@ -0,0 +1,317 @@
+import hashlib
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+from plan_table import PlanTable, estimate_nbytes, required_top_k, unit_rows
+
+# Columns shared by Data_prep.csv and the scraper output
+boolean_columns = ['Vegan', 'Made Without Gluten', 'Vegetarian', 'Organic', 'Halal', 'Breakfast', 'Lunch', 'Dinner']
+numeric_columns = ['Calories', 'Total Fat', 'Total Carbohydrates', 'Protein']
+feature_cols = ['Calories', 'Total Fat', 'Total Carbohydrates', 'Protein', 'Vegan',
+                'Made Without Gluten', 'Vegetarian', 'Organic', 'Halal']
+meal_types = ['Breakfast', 'Lunch', 'Dinner']
+
+# Dining hall flag columns in Data_prep.csv, keyed by location id
+location_columns = {
+    'chase': 'Chase',
+    'lenoir': 'Lenoir'
+}
+
+# Upper bound on the memory used by precomputed plan tables across all shards
+PLAN_TABLE_MAX_BYTES = int(float(os.getenv('VORA_PLAN_TABLE_MAX_MB', '64')) * 1024 * 1024)
+
+# Names the scraper (or users) may use for a known location
+location_aliases = {
+    'top of lenoir': 'lenoir',
+    'lenoir dining hall': 'lenoir',
+    'chase dining hall': 'chase',
+    'chase hall': 'chase'
+}
+
+def normalize_location(name):
+    """Map a dining hall name such as 'Top of Lenoir' to its location id"""
+    if name is None:
+        return None
+    key = re.sub(r'\s+', ' ', str(name).strip().lower())
+    if key in location_aliases:
+        return location_aliases[key]
+    return re.sub(r'[^a-z0-9]+', '_', key).strip('_') or None
+
+def prepare_frame(frame, fill_values=None):
+    """Coerce boolean/numeric columns so the frame can be scored"""
+    frame = frame.copy()
+
+    # Scraped menus carry no meal-period columns, so treat their items as served all day
+    for col in meal_types:
+        if col not in frame.columns:
+            frame[col] = 1
+
+    for col in boolean_columns:
+        if col not in frame.columns:
+            frame[col] = 0
+        frame[col] = frame[col].map({'T': 1, 'F': 0, True: 1, False: 0}).fillna(0)
+
+    for col in numeric_columns:
+        frame[col] = pd.to_numeric(frame[col], errors='coerce')
+        fill = fill_values[col] if fill_values is not None else frame[col].mean()
+        frame[col] = frame[col].fillna(fill)
+
+    return frame.reset_index(drop=True)
+
+def get_dietary_restrictions_text(food_item):
+    """Get a formatted string of dietary restrictions for a food item"""
+    restrictions = []
+    if food_item['Vegan']:
+        restrictions.append('Vegan')
+    if food_item['Vegetarian']:
+        restrictions.append('Vegetarian')
+    if food_item['Made Without Gluten']:
+        restrictions.append('Gluten-Free')
+    if food_item['Halal']:
+        restrictions.append('Halal')
+    if food_item['Organic']:
+        restrictions.append('Organic')
+    return ', '.join(restrictions) if restrictions else 'None'
+
+def recommendation_records(frame):
+    """The fields a meal plan returns for each item, in row order"""
+    return [
+        {
+            'name': str(food_item['Food Name']),
+            'calories': float(food_item['Calories']),
+            'protein': float(food_item['Protein']),
+            'carbs': float(food_item['Total Carbohydrates']),
+            'fat': float(food_item['Total Fat']),
+            'dietary_restrictions': get_dietary_restrictions_text(food_item)
+        }
+        for food_item in frame.to_dict('records')
+    ]
+
+class CatalogShard:
+    """The items served at one location, with their scaled feature matrix"""
+
+    def __init__(self, location, frame, scaler):
+        self.location = location
+        self.df = frame.reset_index(drop=True)
+        self.features = scaler.transform(self.df[feature_cols].values)
+        # Unit-length rows, so cosine similarity with a unit vector is a dot product
+        self.unit_features = unit_rows(self.features)
+        self.meal_masks = {meal: (self.df[meal] == 1).values for meal in meal_types}
+        # Built once so a request does not index the frame row by row
+        self.recommendations = recommendation_records(self.df)
+        self.version = self._fingerprint(scaler)
+        self.plan_table = None
+
+    def __len__(self):
+        return len(self.df)
+
+    def _fingerprint(self, scaler):
+        """Content hash of the shard, identical across workers loading the same data"""
+        digest = hashlib.sha1()
+        digest.update(pd.util.hash_pandas_object(self.df, index=False).values.tobytes())
+        digest.update(np.asarray(scaler.mean_).tobytes())
+        digest.update(np.asarray(scaler.scale_).tobytes())
+        return digest.hexdigest()[:16]
+
+    def dietary_mask(self, preferences):
+        """Mask of items that satisfy every dietary restriction in preferences"""
+        mask = np.ones(len(self.df), dtype=bool)
+        if preferences.get('vegan', False):
+            mask &= (self.df['Vegan'] == 1).values
+            mask &= (self.df['Vegetarian'] == 1).values
+        if preferences.get('vegetarian', False):
+            mask &= (self.df['Vegetarian'] == 1).values
+        if preferences.get('gluten_free', False):
+            mask &= (self.df['Made Without Gluten'] == 1).values
+        if preferences.get('halal', False):
+            mask &= (self.df['Halal'] == 1).values
+        return mask
+
+class Catalog:
+    """Food catalog sharded by dining hall
+
+    The scaler is fit once on the base catalog and shared by every shard, so
+    scores stay comparable across locations and adding a location never
+    touches the shards that already exist.
+    """
+
+    def __init__(self, frame, plan_table_max_bytes=PLAN_TABLE_MAX_BYTES, scraped_dir=None):
+        self.plan_table_max_bytes = plan_table_max_bytes
+        # Scraped menus are saved here, one CSV per location, when set
+        self.scraped_dir = Path(scraped_dir) if scraped_dir else None
+        self.df = prepare_frame(frame)
+        self.fill_values = {col: self.df[col].mean() for col in numeric_columns}
+        self.scaler = StandardScaler()
+        self.scaler.fit(self.df[feature_cols].values)
+
+        # Shard covering every item, used when no location is requested
+        self.full = CatalogShard('all', self.df, self.scaler)
+        self.shards = {}
+
+        # Base rows served at each location, and the latest scraped items per location
+        self.served = {}
+        self.scraped = {}
+
+        for location, column in location_columns.items():
+            if column in self.df.columns:
+                served = self.df[column].map({'T': True, 'F': False, True: True, False: False}).fillna(False)
+                self.served[location] = served.astype(bool).values
+                self.add_shard(location, self.df[self.served[location]])
+
+        # Per-location shards get plan table budget first, the full shard takes what is left
+        self.attach_plan_table(self.full)
+
+    @classmethod
+    def from_csv(cls, path, scraped_dir=None):
+        """Load the base catalog, then any scraped menus previously saved in scraped_dir"""
+        catalog = cls(pd.read_csv(path), scraped_dir=scraped_dir)
+        if catalog.scraped_dir is not None and catalog.scraped_dir.is_dir():
+            menus = [pd.read_csv(menu) for menu in sorted(catalog.scraped_dir.glob('*.csv'))]
+            if menus:
+                catalog.add_scraped_menu(pd.concat(menus, ignore_index=True), save=False)
+        return catalog
+
+    @property
+    def locations(self):
+        return sorted(self.shards)
+
+    def add_shard(self, location, frame):
+        """Add or replace the shard for a single location"""
+        key = normalize_location(location)
+        if not key:
+            raise ValueError(f"Invalid location: {location!r}")
+        shard = CatalogShard(key, prepare_frame(frame, self.fill_values), self.scaler)
+        previous = self.shards.get(key)
+        if previous is not None:
+            # Release the replaced shard's table before checking the budget
+            previous.plan_table = None
+        self.attach_plan_table(shard)
+        self.shards[key] = shard
+        return shard
+
+    @property
+    def plan_table_bytes(self):
+        shards = [self.full, *self.shards.values()]
+        return sum(shard.plan_table.nbytes for shard in shards if shard.plan_table is not None)
+
+    def attach_plan_table(self, shard):
+        """Precompute the shard's plan table unless it would exceed the memory budget"""
+        if self.plan_table_max_bytes <= 0:
+            return
+        available = self.plan_table_max_bytes - self.plan_table_bytes
+        n_meals = len(shard.meal_masks)
+
+        # The smallest possible table is cheap to size, so check it before scoring the grid
+        if estimate_nbytes(len(shard), n_meals) > available:
+            top_k = None
+        else:
+            max_k = available // estimate_nbytes(len(shard), n_meals, top_k=1)
+            top_k = required_top_k(shard, self, limit=max_k)
+        if top_k is None:
+            print(f"Plan table for {shard.location} skipped: it would exceed the remaining "
+                  f"{available} of {self.plan_table_max_bytes} budget bytes, using exact scoring")
+            return
+
+        table = PlanTable(shard, self, top_k=top_k)
+        shard.plan_table = table
+        print(f"Plan table for {shard.location}: {len(shard)} items, top {table.top_k}, {table.nbytes} bytes")
+
+    def add_scraped_menu(self, menu_df, save=True):
+        """Add one shard per 'Location' found in scraper output, returns the location ids
+
+        The full shard is rebuilt so requests without a location see the
+        scraped items in place of the base items of the locations they replace.
+        With save, each location's items are also written to scraped_dir so
+        restarted workers load them.
+        """
+        if 'Location' not in menu_df.columns:
+            raise ValueError("Scraped menu has no 'Location' column")
+        # The full shard is rebuilt below, release its table so new locations get budget first
+        self.full.plan_table = None
+        added = []
+        for location, items in menu_df.groupby('Location'):
+            shard = self.add_shard(location, items)
+            self.scraped[shard.location] = shard.df
+            if save:
+                self.save_scraped(shard)
+            added.append(shard.location)
+        self.rebuild_full()
+        return added
+
+    def save_scraped(self, shard):
+        """Write a scraped shard's items to scraped_dir, replacing the location's previous file"""
+        if self.scraped_dir is None:
+            return
+        self.scraped_dir.mkdir(parents=True, exist_ok=True)
+        path = self.scraped_dir / f"{shard.location}.csv"
+        # Write then rename so a worker starting up never reads a partial file
+        partial = self.scraped_dir / f".{shard.location}.{os.getpid()}.tmp"
+        shard.df.to_csv(partial, index=False)
+        os.replace(partial, path)
+
+    def rebuild_full(self):
+        """Rebuild the full shard from the base catalog and the scraped locations"""
+        # Keep base rows still served at a location that has not been scraped, or not tied to any location
+        keep = np.ones(len(self.df), dtype=bool)
+        if self.served:
+            tied = np.zeros(len(self.df), dtype=bool)
+            still_served = np.zeros(len(self.df), dtype=bool)
+            for location, served in self.served.items():
+                tied |= served
+                if location not in self.scraped:
+                    still_served |= served
+            keep = still_served | ~tied
+
+        frame = pd.concat([self.df[keep], *self.scraped.values()], ignore_index=True)
+        # An item scraped at several locations is recommended once
+        frame = frame.drop_duplicates(subset='Food Name', keep='last')
+
+        shard = CatalogShard('all', frame, self.scaler)
+        # Release the replaced table before checking the budget
+        self.full.plan_table = None
+        self.attach_plan_table(shard)
+        self.full = shard
+        return shard
+
+    def get_shard(self, location=None):
+        """Shard for location, the full catalog when location is None, or None if unknown"""
+        if location is None or location == '':
+            return self.full
+        key = normalize_location(location)
+        if key == 'all':
+            return self.full
+        return self.shards.get(key)
+
+    def preference_vector(self, preferences):
+        """Build the scaled user preference vector used for similarity scoring"""
+        return self.preference_vectors(
+            preferences,
+            [float(preferences.get('target_calories', 2000))],
+            [float(preferences.get('target_protein', 50))]
+        )[0]
+
+    def preference_vectors(self, preferences, target_calories, target_protein):
+        """Scaled preference vectors for one set of restrictions and many daily targets"""
+        user_pref = np.zeros((len(target_calories), len(feature_cols)))
+
+        dietary_mapping = {
+            'vegan': 'Vegan',
+            'gluten_free': 'Made Without Gluten',
+            'vegetarian': 'Vegetarian',
+            'halal': 'Halal'
+        }
+        for pref_key, feature_key in dietary_mapping.items():
+            if bool(preferences.get(pref_key, False)):
+                user_pref[:, feature_cols.index(feature_key)] = 1
+
+        # Calorie and protein targets are per day, score against a single meal
+        user_pref[:, feature_cols.index('Calories')] = np.asarray(target_calories, dtype=float) / 3
+        user_pref[:, feature_cols.index('Protein')] = np.asarray(target_protein, dtype=float) / 3
+
+        # Same as scaler.transform, without its per-call input validation
+        return (user_pref - self.scaler.mean_) / self.scaler.scale_
@@ -0,0 +1,72 @@
+"""Export the catalog as a slim NumPy artifact for the serverless entry point
+
+    cd backend
+    python export_artifact.py                       # writes ../api/recommender.npz
+    python export_artifact.py lenoir_menu_*.csv     # also adds scraped locations
+
+The artifact holds each shard's scaled feature matrix, the scaler
+parameters and the fields shown in a meal plan, so api/recommender.py can
+serve recommendations with NumPy alone.
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from catalog import Catalog, feature_cols, location_aliases, meal_types
+
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_OUTPUT = BASE_DIR.parent / 'api' / 'recommender.npz'
+
+def restriction_text(frame):
+    """Same labels as catalog.get_dietary_restrictions_text, for every row"""
+    labels = [('Vegan', 'Vegan'), ('Vegetarian', 'Vegetarian'), ('Made Without Gluten', 'Gluten-Free'),
+              ('Halal', 'Halal'), ('Organic', 'Organic')]
+    texts = []
+    for _, item in frame.iterrows():
+        restrictions = [label for col, label in labels if item[col]]
+        texts.append(', '.join(restrictions) if restrictions else 'None')
+    return texts
+
+def export(catalog, output):
+    """Write every shard of catalog to output, one contiguous block of rows per shard"""
+    shards = [catalog.full] + [catalog.shards[location] for location in catalog.locations]
+    offsets = np.cumsum([0] + [len(shard) for shard in shards])
+    frame = pd.concat([shard.df for shard in shards], ignore_index=True)
+
+    np.savez_compressed(
+        output,
+        shard_names=np.array([shard.location for shard in shards]),
+        shard_offsets=offsets.astype(np.int64),
+        feature_cols=np.array(feature_cols),
+        scaler_mean=catalog.scaler.mean_.astype(np.float64),
+        scaler_scale=catalog.scaler.scale_.astype(np.float64),
+        alias_names=np.array(list(location_aliases)),
+        alias_locations=np.array(list(location_aliases.values())),
+        features=np.vstack([shard.features for shard in shards]),
+        names=np.array(frame['Food Name'].astype(str).tolist(), dtype=np.str_),
+        restrictions=np.array(restriction_text(frame)),
+        nutrition=frame[['Calories', 'Protein', 'Total Carbohydrates', 'Total Fat']].values.astype(np.float64),
+        dietary=frame[['Vegan', 'Vegetarian', 'Made Without Gluten', 'Halal']].values.astype(bool),
+        meals=frame[meal_types].values.astype(bool)
+    )
+    return output
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('scraped', nargs='*', type=Path, help='scraper CSVs to add as locations')
+    parser.add_argument('--catalog', type=Path, default=BASE_DIR / 'Data_prep.csv')
+    parser.add_argument('--output', type=Path, default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    # The artifact does not use plan tables, skip building them
+    catalog = Catalog(pd.read_csv(args.catalog), plan_table_max_bytes=0)
+    for path in args.scraped:
+        catalog.add_scraped_menu(pd.read_csv(path))
+
+    export(catalog, args.output)
+    print(f"Wrote {args.output} ({args.output.stat().st_size} bytes, shards: {', '.join(['all'] + catalog.locations)})")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+import os
+import tempfile
+
+# Workers write metrics to shared files here. prometheus_client picks its storage when
+# first imported and workers fork from this process, so this must come before the import.
+if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ and 'prometheus_multiproc_dir' not in os.environ:
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='vora-metrics-')
+
+from prometheus_client import CollectorRegistry, multiprocess, start_http_server  # noqa: E402
+
+bind = os.getenv('BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+# More than one thread per worker lets /admin/profile sample concurrent requests.
+# backend.py sizes the LLM concurrency limit and queue from the same variable.
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges from the shared metrics directory"""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ or 'prometheus_multiproc_dir' in os.environ:
+        multiprocess.mark_process_dead(worker.pid)
+
+def when_ready(server):
+    """Serve the workers' combined metrics from the master, on an internal address only"""
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    addr = os.getenv('VORA_METRICS_BIND', '127.0.0.1')
+    port = int(os.getenv('VORA_METRICS_PORT', '9100'))
+    start_http_server(port, addr=addr, registry=registry)
+    server.log.info(f"Metrics available at http://{addr}:{port}/metrics")
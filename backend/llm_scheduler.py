@@ -0,0 +1,163 @@
+import math
+import random
+import threading
+import time
+
+from metrics import observe_stage
+
+# Provider responses worth retrying: timeouts, conflicts, rate limits and overload
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+RETRYABLE_ERROR_NAMES = {'APIConnectionError', 'APITimeoutError'}
+
+class LLMOverloaded(Exception):
+    """No LLM slot became free in time, the caller should back off"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"LLM is overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+class CircuitOpenError(Exception):
+    """The circuit breaker is open and LLM calls are short-circuited"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"LLM circuit is open, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+def is_retryable(error):
+    """Whether an error from the LLM client is transient"""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if type(error).__name__ in RETRYABLE_ERROR_NAMES:
+        return True
+    return getattr(error, 'status_code', None) in RETRYABLE_STATUS_CODES
+
+class CircuitBreaker:
+    """Opens after consecutive failures, then lets a single probe through once the reset timeout passes"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def retry_after(self):
+        if self.opened_at is None:
+            return 0
+        return max(math.ceil(self.reset_timeout - (self.clock() - self.opened_at)), 1)
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def release_probe(self):
+        """Let another caller probe when the current probe never reached the provider"""
+        with self._lock:
+            self.probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self.probing = False
+
+class LLMScheduler:
+    """Admission control around LLM calls
+
+    At most max_concurrency calls run at once and at most max_queue callers
+    wait for a slot, each for up to queue_timeout seconds; anyone else gets
+    LLMOverloaded. Transient errors are retried with jittered exponential
+    backoff and repeated failures open the circuit breaker.
+    """
+
+    def __init__(self, max_concurrency=4, max_queue=16, queue_timeout=10.0, max_retries=2,
+                 backoff_base=0.5, backoff_max=8.0, breaker=None, sleep=time.sleep):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.sleep = sleep
+        self.waiting = 0
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+
+    def backoff(self, attempt):
+        """Full-jitter delay before retry number attempt"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _acquire(self):
+        if self._slots.acquire(blocking=False):
+            return
+
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                raise LLMOverloaded(math.ceil(self.queue_timeout))
+            self.waiting += 1
+
+        try:
+            with observe_stage('llm_queue_wait'):
+                acquired = self._slots.acquire(timeout=self.queue_timeout)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+        if not acquired:
+            raise LLMOverloaded(math.ceil(self.queue_timeout))
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn under the concurrency limit, retrying transient errors"""
+        if not self.breaker.allow():
+            raise CircuitOpenError(self.breaker.retry_after())
+
+        try:
+            self._acquire()
+        except LLMOverloaded:
+            self.breaker.release_probe()
+            raise
+
+        try:
+            attempt = 0
+            while True:
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception as e:
+                    if not is_retryable(e):
+                        # Not a sign of provider trouble, leave the circuit as it is
+                        self.breaker.release_probe()
+                        raise
+                    if attempt >= self.max_retries:
+                        self.breaker.record_failure()
+                        raise
+                    self.sleep(self.backoff(attempt))
+                    attempt += 1
+                    continue
+                self.breaker.record_success()
+                return result
+        finally:
+            self._slots.release()
@@ -0,0 +1,84 @@
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, request
+from prometheus_client import REGISTRY, CollectorRegistry, Histogram, multiprocess, start_http_server
+
+# Under gunicorn, PROMETHEUS_MULTIPROC_DIR points at an empty directory so every
+# worker writes its samples to shared mmap files (gunicorn.conf.py sets one up).
+MULTIPROCESS = 'PROMETHEUS_MULTIPROC_DIR' in os.environ or 'prometheus_multiproc_dir' in os.environ
+
+# /metrics is served on its own address, loopback by default, never on the public app port
+METRICS_BIND = os.getenv('VORA_METRICS_BIND', '127.0.0.1')
+METRICS_PORT = int(os.getenv('VORA_METRICS_PORT', '9100'))
+
+REQUEST_LATENCY = Histogram(
+    'vora_request_duration_seconds',
+    'Time spent handling a request, by endpoint',
+    ['endpoint', 'method', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+STAGE_LATENCY = Histogram(
+    'vora_stage_duration_seconds',
+    'Time spent in each pipeline stage',
+    ['stage'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+
+@contextmanager
+def observe_stage(stage):
+    """Time the enclosed block as a pipeline stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(stage).observe(time.perf_counter() - start)
+
+def timed(stage):
+    """Decorator that records each call of the function as a pipeline stage"""
+    def decorator(f):
+        histogram = STAGE_LATENCY.labels(stage)
+
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return decorated
+    return decorator
+
+def metrics_registry():
+    """Registry holding every worker's samples in multiprocess mode, else this process's"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+def start_metrics_server(port=METRICS_PORT, addr=METRICS_BIND):
+    """Serve /metrics in the Prometheus text format from a background thread"""
+    start_http_server(port, addr=addr, registry=metrics_registry())
+    print(f"Metrics available at http://{addr}:{port}/metrics")
+
+def init_app(app):
+    """Record per-endpoint latency, served by start_metrics_server"""
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            # Label by view function, not raw path, to keep label cardinality bounded
+            REQUEST_LATENCY.labels(
+                request.endpoint or 'unmatched',
+                request.method,
+                str(response.status_code)
+            ).observe(time.perf_counter() - start)
+        return response
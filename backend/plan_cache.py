@@ -0,0 +1,53 @@
+import threading
+from collections import OrderedDict
+
+from responses import encode_json, etag_for
+
+def cache_key(preferences, location, seed, catalog_version):
+    """Key a plan by normalized preferences, location, seed and catalog version"""
+    return (
+        bool(preferences.get('vegan', False)),
+        bool(preferences.get('vegetarian', False)),
+        bool(preferences.get('gluten_free', False)),
+        bool(preferences.get('halal', False)),
+        round(float(preferences.get('target_calories', 2000)), 1),
+        round(float(preferences.get('target_protein', 50)), 1),
+        location or 'all',
+        seed,
+        catalog_version
+    )
+
+class CachedPlan:
+    """Serialized meal plan, its ETag and a lazily compressed body"""
+
+    def __init__(self, meal_plan):
+        self.body = encode_json(meal_plan)
+        self.etag = etag_for(self.body)
+        self.gzipped = None
+
+class PlanCache:
+    """Thread-safe LRU cache of serialized meal plans"""
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, meal_plan):
+        entry = CachedPlan(meal_plan)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,136 @@
+import numpy as np
+
+restriction_keys = ['vegan', 'vegetarian', 'gluten_free', 'halal']
+
+# Daily targets covered by the table, anything outside falls back to exact scoring
+CALORIE_GRID = np.arange(1200, 4001, 100)
+PROTEIN_GRID = np.arange(20, 251, 10)
+# Fewest candidates stored per bucket, raised per shard by required_top_k
+TOP_K = 25
+
+# get_meal_recommendations adds up to +-JITTER to each score and keeps the best PICKS,
+# so any item within 2 * JITTER of the PICKS-th best score can be picked. The extra
+# slack covers targets between grid points.
+JITTER = 0.1
+PICKS = 5
+MARGIN = 2 * JITTER + 0.02
+
+# Grid points scored at once, bounds the temporary similarity matrix on large catalogs
+CHUNK_SIZE = 64
+
+def restriction_index(preferences):
+    """Index of a combination of dietary restrictions, one bit per restriction"""
+    index = 0
+    for bit, key in enumerate(restriction_keys):
+        if bool(preferences.get(key, False)):
+            index |= 1 << bit
+    return index
+
+def grid_index(grid, value):
+    """Nearest grid point for value, or None when it lies outside the grid"""
+    step = grid[1] - grid[0]
+    position = int(round((value - grid[0]) / step))
+    if position < 0 or position >= len(grid):
+        return None
+    return position
+
+def index_dtype(n_items):
+    """Smallest index type that can address n_items, leaving -1 to mark an empty slot"""
+    return np.int16 if n_items < np.iinfo(np.int16).max else np.int32
+
+def estimate_nbytes(n_items, n_meals=3, calorie_grid=CALORIE_GRID, protein_grid=PROTEIN_GRID, top_k=TOP_K):
+    """Size of the table PlanTable would build for a shard of n_items"""
+    slots = 2 ** len(restriction_keys) * len(calorie_grid) * len(protein_grid) * n_meals * min(top_k, n_items)
+    return slots * np.dtype(index_dtype(n_items)).itemsize
+
+def unit_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+def bucket_scores(shard, catalog, calorie_grid=CALORIE_GRID, protein_grid=PROTEIN_GRID):
+    """Yield (combo, meal index, items, first grid point, scores) for each chunk of grid points
+
+    scores holds the cosine similarity of every allowed item for up to
+    CHUNK_SIZE grid points, one row per point.
+    """
+    features = shard.unit_features
+    calories, protein = np.meshgrid(calorie_grid, protein_grid, indexing='ij')
+    calories, protein = calories.ravel(), protein.ravel()
+
+    for combo in range(2 ** len(restriction_keys)):
+        preferences = {key: bool(combo >> bit & 1) for bit, key in enumerate(restriction_keys)}
+        valid = shard.dietary_mask(preferences)
+        users = unit_rows(catalog.preference_vectors(preferences, calories, protein))
+
+        for m, meal_type in enumerate(shard.meal_masks):
+            allowed = valid & shard.meal_masks[meal_type]
+            if not allowed.any():
+                continue
+            items = np.flatnonzero(allowed)
+            for start in range(0, len(users), CHUNK_SIZE):
+                yield combo, m, items, start, users[start:start + CHUNK_SIZE] @ features[items].T
+
+def required_top_k(shard, catalog, calorie_grid=CALORIE_GRID, protein_grid=PROTEIN_GRID, top_k=TOP_K, limit=None):
+    """Candidates per bucket needed so the jittered top picks always come from the table
+
+    Returns None as soon as more than limit candidates would be needed.
+    """
+    needed = min(top_k, len(shard))
+    for _, _, items, _, scores in bucket_scores(shard, catalog, calorie_grid, protein_grid):
+        if len(items) <= max(needed, PICKS):
+            continue
+        cutoff = -np.partition(-scores, PICKS - 1, axis=1)[:, PICKS - 1] - MARGIN
+        needed = max(needed, int((scores >= cutoff[:, None]).sum(axis=1).max()))
+        if limit is not None and needed > limit:
+            return None
+    return needed
+
+class PlanTable:
+    """Top-k candidates per restriction combination x calorie bucket x protein bucket x meal
+
+    Built once per catalog shard. A request then looks up its bucket and only
+    re-ranks the k stored candidates instead of scoring the whole shard. k is
+    at least TOP_K and large enough that the random variation added to scores
+    cannot lift an item outside the table into the top picks.
+    """
+
+    def __init__(self, shard, catalog, calorie_grid=CALORIE_GRID, protein_grid=PROTEIN_GRID, top_k=None):
+        self.calorie_grid = calorie_grid
+        self.protein_grid = protein_grid
+        self.meal_types = list(shard.meal_masks)
+        if top_k is None:
+            top_k = required_top_k(shard, catalog, calorie_grid, protein_grid)
+        self.top_k = min(top_k, len(shard))
+
+        shape = (2 ** len(restriction_keys), len(calorie_grid), len(protein_grid), len(self.meal_types), self.top_k)
+        self.candidates = np.full(shape, -1, dtype=index_dtype(len(shard)))
+
+        if self.top_k == 0:
+            return
+
+        for combo, m, items, start, scores in bucket_scores(shard, catalog, calorie_grid, protein_grid):
+            k = min(self.top_k, len(items))
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+            best = items[np.take_along_axis(top, order, axis=1)]
+
+            rows = np.arange(start, start + len(best))
+            self.candidates[combo, rows // len(protein_grid), rows % len(protein_grid), m, :k] = best
+
+    @property
+    def nbytes(self):
+        return self.candidates.nbytes
+
+    def lookup(self, preferences):
+        """Candidate item indices per meal type for preferences, or None when off the grid"""
+        cal = grid_index(self.calorie_grid, float(preferences.get('target_calories', 2000)))
+        pro = grid_index(self.protein_grid, float(preferences.get('target_protein', 50)))
+        if cal is None or pro is None:
+            return None
+
+        cell = self.candidates[restriction_index(preferences), cal, pro]
+        return {
+            meal_type: cell[m][cell[m] >= 0].astype(np.intp)
+            for m, meal_type in enumerate(self.meal_types)
+        }
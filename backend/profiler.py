@@ -0,0 +1,145 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from flask import current_app, g, request
+
+# Per-request profiling is only available when this directory is configured
+PROFILE_DIR = os.getenv('VORA_PROFILE_DIR')
+PROFILE_HEADER = 'X-Vora-Profile'
+PROFILE_PERMISSION = 'admin:profile'
+# Bounds on per-request profiles sampling at once in a worker and on files kept in PROFILE_DIR
+MAX_ACTIVE_PROFILES = int(os.getenv('VORA_PROFILE_MAX_ACTIVE', '2'))
+MAX_PROFILE_FILES = int(os.getenv('VORA_PROFILE_MAX_FILES', '100'))
+DEFAULT_INTERVAL = 0.005
+MAX_DURATION = 60
+
+def frame_stack(frame):
+    """Collapse a frame into 'file:function;...' form, outermost call first"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+class StackSampler:
+    """Statistical profiler that periodically samples thread stacks
+
+    Runs in a background thread and only reads sys._current_frames(), so the
+    profiled code is never traced and overhead stays proportional to the
+    sampling rate.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, thread_ids=None):
+        self.interval = interval
+        self.thread_ids = set(thread_ids) if thread_ids else None
+        self.ignored_ids = set()
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='vora-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def ignore_thread(self, thread_id):
+        """Exclude a thread, e.g. the one waiting on the sampler, from the output"""
+        self.ignored_ids.add(thread_id)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or thread_id in self.ignored_ids:
+                    continue
+                if self.thread_ids is not None and thread_id not in self.thread_ids:
+                    continue
+                self.stacks[frame_stack(frame)] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        """Stacks in the collapsed format read by flamegraph.pl and speedscope"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+def profile_for(seconds, interval=DEFAULT_INTERVAL):
+    """Sample every other thread in this worker for the given number of seconds"""
+    seconds = min(max(float(seconds), 0.1), MAX_DURATION)
+    sampler = StackSampler(interval=interval)
+    sampler.ignore_thread(threading.get_ident())
+    sampler.start()
+    time.sleep(seconds)
+    return sampler.stop()
+
+_active_profiles = threading.BoundedSemaphore(MAX_ACTIVE_PROFILES)
+
+def start_request_profile():
+    """Sample the current request if it sent X-Vora-Profile and its verified token allows it
+
+    Called by auth.requires_auth once the token is verified, so unauthenticated
+    requests never start a sampler.
+    """
+    if 'vora_profiler' not in current_app.extensions or not request.headers.get(PROFILE_HEADER):
+        return
+    payload = g.get('current_user') or {}
+    if PROFILE_PERMISSION not in payload.get('permissions', []):
+        return
+    if not _active_profiles.acquire(blocking=False):
+        print("Request profile skipped: too many profiles running")
+        return
+    g.profiler = StackSampler(thread_ids=[threading.get_ident()]).start()
+
+def stop_request_profile():
+    """Stop the current request's sampler, if any, and free its slot"""
+    sampler = g.pop('profiler', None)
+    if sampler is not None:
+        sampler.stop()
+        _active_profiles.release()
+    return sampler
+
+def prune_profiles(directory, keep=MAX_PROFILE_FILES):
+    """Delete the oldest profiles so at most keep files remain"""
+    files = sorted(Path(directory).glob('*.folded'), key=lambda path: path.stat().st_mtime)
+    for path in files[:max(len(files) - keep, 0)]:
+        # Another worker may have removed it already
+        path.unlink(missing_ok=True)
+
+def init_app(app):
+    """Enable opt-in per-request profiling through the X-Vora-Profile header"""
+    if not PROFILE_DIR:
+        return
+
+    Path(PROFILE_DIR).mkdir(parents=True, exist_ok=True)
+    app.extensions['vora_profiler'] = True
+
+    @app.after_request
+    def write_request_profile(response):
+        sampler = stop_request_profile()
+        if sampler is not None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            filename = f"{request.endpoint or 'unmatched'}_{timestamp}_{os.getpid()}.folded"
+            with open(Path(PROFILE_DIR) / filename, 'w') as f:
+                f.write(sampler.collapsed())
+            try:
+                prune_profiles(PROFILE_DIR)
+            except OSError as e:
+                print(f"Error pruning profiles: {str(e)}")
+            response.headers['X-Vora-Profile-File'] = filename
+        return response
+
+    @app.teardown_request
+    def release_request_profile(exc):
+        # after_request is skipped when the view raises
+        stop_request_profile()
@@ -0,0 +1,35 @@
+import hashlib
+from datetime import date
+
+# Standard library only, so the serverless entry point can share these without the full backend
+
+def parse_bool(value):
+    """Interpret JSON booleans and query string flags such as 'true' or '1'"""
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+def plan_seed(user_id, day=None):
+    """Stable seed for a user's plan on a given day"""
+    day = day or date.today()
+    digest = hashlib.sha256(f"{user_id or ''}:{day.isoformat()}".encode()).digest()
+    return int.from_bytes(digest[:4], 'big')
+
+def resolve_seed(value, user_id):
+    """Seed from a request: a non-negative integer, 'daily' for a per-user daily plan, or None
+
+    user_id should be the verified token subject. Raises ValueError for
+    anything else, including floats and booleans.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        if value.lower() == 'daily':
+            return plan_seed(user_id)
+        if not value.isdecimal():
+            raise ValueError(f"Invalid seed: {value!r}")
+        return int(value)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise ValueError(f"Invalid seed: {value!r}")
+    return value
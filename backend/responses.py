@@ -0,0 +1,51 @@
+import gzip
+import hashlib
+
+import orjson
+from flask import Response, request
+
+# Bodies smaller than this are not worth the gzip CPU time
+GZIP_MIN_BYTES = 1024
+
+def encode_json(payload):
+    """Serialize a payload to JSON bytes with orjson"""
+    # Sorted keys match jsonify's output and keep cached bodies byte-stable
+    return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_SORT_KEYS)
+
+def etag_for(body):
+    """Strong ETag derived from the response body"""
+    return hashlib.sha1(body).hexdigest()
+
+def accepts_gzip(body):
+    # Honors q-values, so 'gzip;q=0' opts out
+    return len(body) >= GZIP_MIN_BYTES and request.accept_encodings['gzip'] > 0
+
+def json_response(payload, status=200):
+    """JSON response serialized with orjson, gzipped when large and accepted"""
+    body = encode_json(payload)
+    headers = {'Vary': 'Accept-Encoding'}
+    if accepts_gzip(body):
+        body = gzip.compress(body, compresslevel=5)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(body, status=status, mimetype='application/json', headers=headers)
+
+def cached_response(entry):
+    """Response for a cached entry with body and etag, answering 304 when the client is current
+
+    The gzipped body is computed once and kept on the entry.
+    """
+    headers = {
+        'ETag': f'"{entry.etag}"',
+        'Cache-Control': 'private, no-cache',
+        'Vary': 'Accept-Encoding'
+    }
+    if entry.etag in request.if_none_match:
+        return Response(status=304, headers=headers)
+
+    body = entry.body
+    if accepts_gzip(body):
+        if entry.gzipped is None:
+            entry.gzipped = gzip.compress(body, compresslevel=5)
+        body = entry.gzipped
+        headers['Content-Encoding'] = 'gzip'
+    return Response(body, mimetype='application/json', headers=headers)